@@ -1,13 +1,18 @@
 import streamlit as st
 import pandas as pd
-import gspread
-from google.oauth2.service_account import Credentials
 from datetime import date
-import plotly.express as px
 from streamlit_option_menu import option_menu
-from streamlit_extras.metric_cards import style_metric_cards
 from streamlit_lottie import st_lottie
 import requests
+import hashlib
+from collections import Counter
+from itertools import islice
+from pagina_dashboard import dashboard_financeiro
+import importacao
+import recorrentes
+from lembretes import AgendadorLembretes, NotificadorArquivo, NotificadorLog, RegistroEnviados
+import dados
+from valores import para_centavos
 
 # ===================== CSS Premium ==========================
 st.set_page_config(page_title="Controle de Finanças", layout="wide")
@@ -90,165 +95,71 @@ def mostra_lottie(url, altura=120, key=None):
         st.info("Não foi possível carregar a animação.")
 
 # ========== GOOGLE SHEETS ==========
-SCOPE = [
-    'https://www.googleapis.com/auth/spreadsheets',
-    'https://www.googleapis.com/auth/drive'
-]
 # Para Streamlit Cloud, o segredo vai em st.secrets["google_service_account"]
-creds = Credentials.from_service_account_info(st.secrets["google_service_account"], scopes=SCOPE)
-gc = gspread.authorize(creds)
-SHEET_NAME = 'Controle finanças'
-WORKSHEET_TRANSACOES = 'Transacoes'
-WORKSHEET_CARTOES = 'Cartoes'
-sheet = gc.open(SHEET_NAME)
-worksheet = sheet.worksheet(WORKSHEET_TRANSACOES)
-try:
-    worksheet_cartoes = sheet.worksheet(WORKSHEET_CARTOES)
-except:
-    worksheet_cartoes = sheet.add_worksheet(title=WORKSHEET_CARTOES, rows="100", cols="5")
-    worksheet_cartoes.append_row(["Nome", "Limite", "Vencimento"])
-
-def normaliza_valor(valor_str):
-    if valor_str is None:
-        return 0.0
-    valor_str = str(valor_str).replace(" ", "").replace(" ", "").strip()
-    if "." in valor_str and "," in valor_str:
-        valor_str = valor_str.replace(".", "")
-        valor_str = valor_str.replace(",", ".")
-    elif "," in valor_str:
-        valor_str = valor_str.replace(",", ".")
-    return float(valor_str)
+@st.cache_resource
+def conexao_planilha():
+    return dados.conectar(st.secrets["google_service_account"])
+
+worksheet, worksheet_cartoes, worksheet_recorrentes = conexao_planilha()
 
 def formatar_brl(valor):
     cor = "#24bb4e" if valor > 0 else "#e4002b" if valor < 0 else "#666"
     return f"<span style='color:{cor}; font-weight:700;'>R$ {abs(valor):,.2f}</span>".replace(",", "X").replace(".", ",").replace("X", ".")
 
-def ler_transacoes():
-    rows = worksheet.get_all_records()
-    for row in rows:
-        try:
-            row["Valor"] = float(normaliza_valor(row["Valor"]))
-        except Exception:
-            row["Valor"] = 0.0
-    return rows if rows else []
-
-def adicionar_transacao(data_vencimento, data_pagamento, descricao, valor, categoria, tipo, telefone="", pago="N"):
-    valor_final = valor if tipo == "Entrada" else -valor
-    valor_final_str = "{:.2f}".format(valor_final).replace(",", ".")
-    worksheet.append_row([
-        str(data_vencimento) if data_vencimento else "",
-        str(data_pagamento) if data_pagamento else "",
-        descricao,
-        valor_final_str,
-        categoria,
-        tipo,
-        telefone,
-        pago
-    ])
-
-def ler_cartoes():
-    rows = worksheet_cartoes.get_all_records()
-    return [
-        {
-            "nome": r.get("Nome"),
-            "limite": float(normaliza_valor(r.get("Limite"))),
-            "vencimento": int(r.get("Vencimento", 0)) if str(r.get("Vencimento", "")).isdigit() else ""
-        }
-        for r in rows if r.get("Nome")
-    ]
-
-def adicionar_cartao(nome, limite, vencimento):
-    worksheet_cartoes.append_row([nome, str(limite), str(vencimento)])
-
-# =========== DASHBOARD ===========
-def dashboard_financeiro():
-    df = pd.DataFrame(st.session_state.transacoes)
-    if df.empty:
-        mostra_lottie("https://assets4.lottiefiles.com/packages/lf20_puciaact.json", altura=140)
-        st.info("Nenhuma transação cadastrada para gerar gráficos.")
-        return
-    # Corrigir nome da coluna de data conforme seu app (Data Vencimento ou Data)
-    if "Data" in df.columns:
-        df["Data"] = pd.to_datetime(df["Data"], errors="coerce")
-    elif "Data Vencimento" in df.columns:
-        df["Data"] = pd.to_datetime(df["Data Vencimento"], errors="coerce")
-    else:
-        st.warning("Coluna de data não encontrada.")
-        return
-    df = df.dropna(subset=["Data"])  # Remove linhas sem data válida
-    hoje = date.today()
-    mes_atual = hoje.strftime("%Y-%m")
-    df["AnoMes"] = df["Data"].dt.strftime("%Y-%m")
-    df_mes = df[df["AnoMes"] == mes_atual].copy()
-    entradas = df[df["Valor"] > 0]["Valor"].sum()
-    saidas = df[df["Valor"] < 0]["Valor"].sum()
-    saldo_atual = df["Valor"].sum()
-    entrada_mes = df_mes[df_mes["Valor"] > 0]["Valor"].sum()
-    saida_mes = df_mes[df_mes["Valor"] < 0]["Valor"].sum()
-    saldo_mes = df_mes["Valor"].sum()
-    qtd_transacoes = len(df_mes)
-    maior_gasto = df_mes[df_mes["Valor"] < 0]["Valor"].min() if not df_mes[df_mes["Valor"] < 0].empty else 0
-
-    st.markdown("<h1 style='color:#e4002b;'>💸 Dashboard Financeiro</h1>", unsafe_allow_html=True)
-    col_anim, col_kpis = st.columns([1, 3])
-    with col_anim:
-        mostra_lottie("https://assets4.lottiefiles.com/packages/lf20_puciaact.json", altura=130)
-    with col_kpis:
-        kpi1, kpi2, kpi3, kpi4 = st.columns(4)
-        kpi1.metric("Entradas (Mês)", f"R$ {entrada_mes:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."))
-        kpi2.metric("Saídas (Mês)", f"R$ {abs(saida_mes):,.2f}".replace(",", "X").replace(".", ",").replace("X", "."))
-        kpi3.metric("Saldo Atual", f"R$ {saldo_atual:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."))
-        kpi4.metric("Transações", qtd_transacoes)
-        style_metric_cards(
-            background_color="#fffbe7",
-            border_left_color="#e4002b",
-            border_radius_px=18,
-        )
-    st.markdown("---")
-    st.subheader("📈 Evolução do Saldo Acumulado (Mês Atual)")
-    if not df_mes.empty:
-        df_mes_sorted = df_mes.sort_values("Data")
-        df_mes_sorted["Saldo_Acumulado"] = df_mes_sorted["Valor"].cumsum()
-        st.plotly_chart(
-            px.line(
-                df_mes_sorted, x="Data", y="Saldo_Acumulado",
-                markers=True, title="Evolução do Saldo no mês",
-            ),
-            use_container_width=True
-        )
-    st.subheader("🍕 Gastos por Categoria (Mês Atual)")
-    df_gastos = df_mes[df_mes["Valor"] < 0].copy()
-    if not df_gastos.empty:
-        df_gastos["ValorAbs"] = df_gastos["Valor"].abs()
-        st.plotly_chart(
-            px.pie(df_gastos, names="Categoria", values="ValorAbs",
-                   title="Gastos por Categoria"),
-            use_container_width=True
-        )
-    else:
-        st.info("Sem despesas para mostrar pizza.")
-    st.markdown("### Top 5 Maiores Gastos do Mês")
-    top5 = df_gastos.sort_values("ValorAbs", ascending=False).head(5) if not df_gastos.empty else pd.DataFrame()
-    if not top5.empty:
-        st.dataframe(top5[["Data", "Descrição", "Categoria", "ValorAbs"]]
-            .rename(columns={"ValorAbs": "Valor"})
-            .style.format({"Valor": lambda v: f"R$ {abs(v):,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')}),
-            use_container_width=True
+# ========== LEMBRETES ==========
+ARQUIVO_LEMBRETES_ENVIADOS = "lembretes_enviados.jsonl"
+
+@st.cache_resource
+def agendador_lembretes():
+    # Um agendador por processo, compartilhado entre as sessões
+    config = st.secrets.get("lembretes", {})
+    notificador = NotificadorArquivo(config["arquivo"]) if "arquivo" in config else NotificadorLog()
+    agendador = AgendadorLembretes(notificador, RegistroEnviados(ARQUIVO_LEMBRETES_ENVIADOS))
+    # Carrega as pendências já na criação: depois de reiniciar o processo, os
+    # avisos não podem depender de alguém abrir o app para entrar no heap
+    transacoes = dados.ler_transacoes(worksheet)
+    # As regras ficam com o agendador, que expande as ocorrências próximas sozinho
+    agendador.sincronizar(
+        transacoes, dados.ler_recorrentes(worksheet_recorrentes), recorrentes.indice_lancamentos(transacoes)
+    )
+    agendador.iniciar()
+    return agendador
+
+def recarregar_transacoes():
+    # A versão identifica o conteúdo lido; o Dashboard usa como chave de cache
+    st.session_state.transacoes = dados.ler_transacoes(worksheet)
+    st.session_state.versao_transacoes = hashlib.md5(
+        repr(st.session_state.transacoes).encode("utf-8")
+    ).hexdigest()
+    st.session_state.lancadas = recorrentes.indice_lancamentos(st.session_state.transacoes)
+    sincronizar_lembretes()
+
+def recarregar_recorrentes():
+    st.session_state.recorrentes = dados.ler_recorrentes(worksheet_recorrentes)
+    st.session_state.versao_recorrentes = hashlib.md5(
+        repr(st.session_state.recorrentes).encode("utf-8")
+    ).hexdigest()
+    sincronizar_lembretes()
+
+def sincronizar_lembretes():
+    # Na primeira carga as regras ainda não foram lidas; recarregar_recorrentes sincroniza depois
+    if "transacoes" in st.session_state and "recorrentes" in st.session_state:
+        agendador_lembretes().sincronizar(
+            st.session_state.transacoes, st.session_state.recorrentes, st.session_state.lancadas
         )
-    else:
-        st.info("Não há gastos cadastrados neste mês.")
-    st.markdown("#### Outros Indicadores")
-    colA, colB = st.columns(2)
-    colA.metric("Maior gasto", formatar_brl(maior_gasto))
-    colB.metric("Saldo do mês", formatar_brl(saldo_mes))
+
+def transacoes_com_recorrentes(fim):
+    # Transações gravadas + ocorrências ainda não pagas das regras até `fim`
+    ocorrencias = recorrentes.expandir(st.session_state.recorrentes, None, fim, st.session_state.lancadas)
+    return st.session_state.transacoes + list(ocorrencias)
 
 # ======================= SIDEBAR ============================
 with st.sidebar:
     st.image("https://cdn-icons-png.flaticon.com/512/3135/3135715.png", width=64)
     selecionado = option_menu(
         menu_title="",
-        options=["Principal", "Histórico", "Remover", "Cartões", "Dashboard"],
-        icons=["house", "list-task", "trash", "credit-card", "bar-chart"],
+        options=["Principal", "Histórico", "Remover", "Importar", "Recorrentes", "Cartões", "Dashboard"],
+        icons=["house", "list-task", "trash", "upload", "arrow-repeat", "credit-card", "bar-chart"],
         default_index=0,
         orientation="vertical",
         styles={
@@ -263,15 +174,16 @@ if "categorias" not in st.session_state:
 if "pagina" not in st.session_state:
     st.session_state.pagina = selecionado
 
-if "transacoes" not in st.session_state or "cartoes" not in st.session_state:
-    st.session_state.transacoes = ler_transacoes()
-    st.session_state.cartoes = ler_cartoes()
+if "transacoes" not in st.session_state or "cartoes" not in st.session_state or "recorrentes" not in st.session_state:
+    recarregar_transacoes()
+    recarregar_recorrentes()
+    st.session_state.cartoes = dados.ler_cartoes(worksheet_cartoes)
 
 if st.session_state.pagina != selecionado:
     st.session_state.pagina = selecionado
     st.rerun()
 
-cols = ["Data Vencimento", "Data Pagamento", "Descrição", "Valor", "Categoria", "Tipo", "Telefone", "Pago"]
+cols = dados.COLUNAS
 
 # ============= TELAS PRINCIPAIS ==================
 if st.session_state.pagina == "Principal":
@@ -294,38 +206,37 @@ if st.session_state.pagina == "Principal":
                 st.markdown('</div>', unsafe_allow_html=True)
 
                 if enviar:
-                    valor_str_tratado = normaliza_valor(valor_str)
                     try:
-                        valor = float(valor_str_tratado)
-                    except Exception:
+                        centavos = para_centavos(valor_str)
+                    except ValueError:
                         st.warning("Digite um valor numérico válido (ex: 14,98 ou 1.234,56).")
                         st.stop()
                     if not descricao:
                         st.warning("Preencha a descrição da transação.")
-                    elif valor <= 0:
+                    elif centavos <= 0:
                         st.warning("Valor deve ser maior que zero.")
                     else:
                         data_pagamento_str = data_pagamento if pago == "S" or data_pagamento else ""
-                        adicionar_transacao(data_vencimento, data_pagamento_str, descricao, valor, categoria, tipo, telefone, pago)
-                        st.session_state.transacoes = ler_transacoes()
+                        dados.adicionar_transacao(worksheet, data_vencimento, data_pagamento_str, descricao, valor_str, categoria, tipo, telefone, pago)
+                        recarregar_transacoes()
                         st.success("✨ Transação registrada com sucesso!")
                         st.rerun()
         with col_painel:
             mostra_lottie("https://assets10.lottiefiles.com/packages/lf20_vnikrcia.json", altura=120, key="cadastro")
             st.markdown("Preencha os campos ao lado para adicionar uma nova transação.")
 
-            df_total = pd.DataFrame(st.session_state.transacoes)
+            df_total = pd.DataFrame(transacoes_com_recorrentes(recorrentes.fim_do_mes(date.today())))
             if not df_total.empty:
                 nomes_cartoes = [c["nome"] for c in st.session_state.cartoes]
                 saldo_geral = df_total[
                     (df_total['Tipo'].isin(['Entrada', 'Saída'])) &
                     (~df_total['Categoria'].isin(nomes_cartoes))
-                ]['Valor'].sum()
+                ]['Centavos'].sum() / 100
             else:
                 saldo_geral = 0
 
             if not df_total.empty and st.session_state.cartoes:
-                total_cartoes = df_total[df_total["Categoria"].isin(nomes_cartoes)]["Valor"].sum()
+                total_cartoes = df_total[df_total["Categoria"].isin(nomes_cartoes)]["Centavos"].sum() / 100
             else:
                 total_cartoes = 0
 
@@ -336,8 +247,8 @@ if st.session_state.pagina == "Principal":
                     (df_total["Data Vencimento"].dt.strftime("%Y-%m") == mes_atual) &
                     (~df_total["Categoria"].isin(nomes_cartoes))
                 ]
-                entrada_mes = df_mes[df_mes["Valor"] > 0]["Valor"].sum()
-                saida_mes = df_mes[df_mes["Valor"] < 0]["Valor"].sum()
+                entrada_mes = df_mes[df_mes["Centavos"] > 0]["Centavos"].sum() / 100
+                saida_mes = df_mes[df_mes["Centavos"] < 0]["Centavos"].sum() / 100
             else:
                 entrada_mes = 0
                 saida_mes = 0
@@ -365,8 +276,8 @@ if st.session_state.pagina == "Principal":
 # ================= HISTÓRICO =================
 elif st.session_state.pagina == "Histórico":
     st.markdown("## Histórico de Transações")
-    df = pd.DataFrame(st.session_state.transacoes, columns=cols)
-    df["Valor"] = df["Valor"].apply(lambda x: float(normaliza_valor(x)))
+    df = pd.DataFrame(st.session_state.transacoes, columns=cols + ["Centavos"])
+    df["Valor"] = df["Centavos"] / 100
     df = df.sort_values(by="Data Vencimento", ascending=False).reset_index(drop=True)
 
     busca = st.text_input("🔎 Buscar por descrição ou categoria", key="busca_hist")
@@ -405,8 +316,7 @@ elif st.session_state.pagina == "Histórico":
 
 elif st.session_state.pagina == "Remover":
     st.markdown("## Remover Transações em Lote")
-    df = pd.DataFrame(st.session_state.transacoes, columns=cols)
-    df["Valor"] = df["Valor"].apply(lambda x: float(normaliza_valor(x)))
+    df = pd.DataFrame(st.session_state.transacoes, columns=cols + ["Fingerprint"])
     df["Data Vencimento"] = pd.to_datetime(df["Data Vencimento"], errors="coerce")
     df = df.sort_values(by="Data Vencimento", ascending=False).reset_index(drop=True)
 
@@ -462,57 +372,165 @@ elif st.session_state.pagina == "Remover":
             if not indices_remover:
                 st.warning("Selecione ao menos uma transação para remover.")
             else:
-                all_rows = worksheet.get_all_values()[1:]  # Ignora cabeçalho
-                removidos = 0
-                debug_msgs = []
-                for idx_df in sorted(indices_remover, reverse=True):
-                    transacao_df = {
-                        "Data Vencimento": str(df_filtrado.iloc[idx_df]["Data Vencimento"].date() if pd.notnull(df_filtrado.iloc[idx_df]["Data Vencimento"]) else ""),
-                        "Descrição": str(df_filtrado.iloc[idx_df]["Descrição"]).strip(),
-                        "Valor": "{:.2f}".format(float(df_filtrado.iloc[idx_df]["Valor"])).replace(",", "."),
-                        "Categoria": str(df_filtrado.iloc[idx_df]["Categoria"]).strip(),
-                        "Tipo": str(df_filtrado.iloc[idx_df]["Tipo"]).strip(),
-                        "Telefone": str(df_filtrado.iloc[idx_df]["Telefone"]).strip(),
-                        "Pago": str(df_filtrado.iloc[idx_df]["Pago"]).strip()
-                    }
-                    found = False
-                    for row_num, row_values in enumerate(all_rows, start=2):
-                        row_check = {
-                            "Data Vencimento": str(row_values[0]).strip(),
-                            "Descrição": str(row_values[2]).strip(),
-                            "Valor": str(float(normaliza_valor(row_values[3]))),
-                            "Categoria": str(row_values[4]).strip(),
-                            "Tipo": str(row_values[5]).strip(),
-                            "Telefone": str(row_values[6]).strip(),
-                            "Pago": str(row_values[7]).strip(),
-                        }
-                        cmp = (
-                            row_check["Data Vencimento"] == transacao_df["Data Vencimento"] and
-                            row_check["Descrição"] == transacao_df["Descrição"] and
-                            abs(float(row_check["Valor"]) - float(transacao_df["Valor"])) < 0.01 and
-                            row_check["Categoria"] == transacao_df["Categoria"] and
-                            row_check["Tipo"] == transacao_df["Tipo"] and
-                            row_check["Telefone"] == transacao_df["Telefone"] and
-                            row_check["Pago"] == transacao_df["Pago"]
-                        )
-                        if cmp:
-                            worksheet.delete_rows(row_num)
-                            removidos += 1
-                            all_rows.pop(row_num-2)
-                            found = True
-                            break
-                    if not found:
-                        debug_msgs.append(
-                            f"\nLinha no sheets: {row_check}\nLinha no DataFrame: {transacao_df}\n"
-                        )
+                selecionadas = df_filtrado.iloc[indices_remover]
+                removidos, nao_encontrados = dados.remover_transacoes(worksheet, list(selecionadas["Fingerprint"]))
+                debug_msgs = [
+                    f"\nLinha no DataFrame: {linha[cols].to_dict()}\n"
+                    for _, linha in selecionadas[selecionadas["Fingerprint"].isin(nao_encontrados)].iterrows()
+                ]
                 if removidos > 0:
                     st.success(f"{removidos} transação(ões) removida(s) com sucesso!")
                 else:
                     st.warning("Nenhuma transação foi removida. Veja debug abaixo para ajustar campos:\n" + "".join(debug_msgs))
-                st.session_state.transacoes = ler_transacoes()
+                recarregar_transacoes()
                 st.session_state.selecionados_remover = []
                 st.rerun()
 
+elif st.session_state.pagina == "Importar":
+    st.markdown("## 📥 Importar Extrato (CSV/OFX)")
+    arquivo = st.file_uploader("Extrato do banco ou fatura do cartão", type=["csv", "ofx", "qfx", "txt"])
+    nomes_cartoes = [c["nome"] for c in st.session_state.cartoes]
+    col1, col2 = st.columns(2)
+    with col1:
+        categoria_padrao = st.selectbox("Categoria padrão", st.session_state.categorias + nomes_cartoes,
+                                        index=st.session_state.categorias.index("Outros"))
+        inverte_sinal = st.checkbox("Gastos vêm positivos no arquivo (fatura de cartão)")
+    with col2:
+        regras_txt = st.text_area("Regras de categoria (trecho=Categoria)", value=importacao.REGRAS_PADRAO,
+                                  height=180, key="regras_importacao")
+    regras = importacao.parse_regras(regras_txt)
+
+    if arquivo is not None:
+        indice = importacao.indice_importacao(st.session_state.transacoes)
+
+        def pipeline(texto, estatisticas):
+            registros = importacao.ler_extrato(texto, arquivo.name, estatisticas)
+            transacoes = importacao.para_transacoes(registros, regras, categoria_padrao, inverte_sinal=inverte_sinal)
+            return importacao.filtra_novas(transacoes, indice, estatisticas)
+
+        try:
+            with importacao.abre_extrato(arquivo) as texto:
+                previa = list(islice(pipeline(texto, Counter()), 20))
+        except ValueError as e:
+            st.warning(str(e))
+            st.stop()
+        arquivo.seek(0)
+
+        st.subheader("Prévia (primeiras transações novas)")
+        if previa:
+            st.dataframe(pd.DataFrame(previa, columns=cols), use_container_width=True)
+        else:
+            st.info("Nenhuma transação nova encontrada no início do arquivo.")
+
+        if st.button("📥 Importar transações", use_container_width=True):
+            estatisticas = Counter()
+            tamanho = max(arquivo.size, 1)
+            barra = st.progress(0.0, text="Importando...")
+            try:
+                with importacao.abre_extrato(arquivo) as texto:
+                    importacao.importa(
+                        pipeline(texto, estatisticas), cols, lambda linhas: dados.adicionar_transacoes_lote(worksheet, linhas),
+                        ao_progredir=lambda n: barra.progress(min(arquivo.tell() / tamanho, 1.0), text=f"{n} transação(ões) gravada(s)..."),
+                        estatisticas=estatisticas,
+                    )
+            except ValueError as e:
+                st.warning(
+                    f"A importação parou: {e}. "
+                    f"{estatisticas['gravadas']} transação(ões) já tinham sido gravadas; importe o arquivo de novo "
+                    "depois de corrigir, as que já entraram serão ignoradas."
+                )
+            else:
+                barra.progress(1.0, text="Concluído")
+                st.success(
+                    f"{estatisticas['gravadas']} transação(ões) importada(s). "
+                    f"{estatisticas['duplicadas']} já existiam e {estatisticas['ignoradas']} linha(s) não puderam ser lidas."
+                )
+            finally:
+                # Mesmo com falha no meio, os lotes gravados precisam aparecer no app
+                if estatisticas["gravadas"]:
+                    recarregar_transacoes()
+
+elif st.session_state.pagina == "Recorrentes":
+    st.markdown("## 🔁 Transações Recorrentes")
+    st.subheader("Nova regra")
+    with st.form("form_recorrente"):
+        col1, col2, col3 = st.columns([4,2,2])
+        with col1:
+            descricao = st.text_input("Descrição", placeholder="Ex: Aluguel, Salário, Internet")
+        with col2:
+            valor = st.text_input("Valor (R$)", placeholder="Ex: 1.200,00")
+        with col3:
+            dia = st.number_input("Dia do mês", min_value=1, max_value=31, step=1, format="%d")
+        col4, col5, col6 = st.columns(3)
+        with col4:
+            categoria = st.selectbox("Categoria", st.session_state.categorias,
+                                     index=st.session_state.categorias.index("Gastos Fixos"))
+            tipo = st.radio("Movimento", ["Entrada", "Saída"], horizontal=True, index=1)
+        with col5:
+            inicio = st.date_input("Início", value=date.today().replace(day=1), format="DD/MM/YYYY")
+        with col6:
+            fim = st.date_input("Fim (opcional)", value=None, format="DD/MM/YYYY")
+        telefone = st.text_input("WhatsApp/SMS", placeholder="Ex: 5511999998888")
+        submit_regra = st.form_submit_button("Cadastrar regra")
+        if submit_regra:
+            try:
+                centavos = para_centavos(valor)
+            except ValueError:
+                centavos = 0
+            if not descricao or centavos <= 0:
+                st.warning("Preencha a descrição e um valor maior que zero.")
+            elif fim and fim < inicio:
+                st.warning("A data de fim deve ser depois do início.")
+            else:
+                dados.adicionar_recorrente(worksheet_recorrentes, descricao, valor, categoria, tipo, dia, inicio, fim, telefone)
+                recarregar_recorrentes()
+                st.success(f"Regra '{descricao}' cadastrada!")
+                st.rerun()
+
+    st.divider()
+    st.subheader("Suas regras")
+    if st.session_state.recorrentes:
+        for regra in st.session_state.recorrentes:
+            col1, col2, col3, col4 = st.columns([4,2,3,1])
+            with col1:
+                st.markdown(f"<b>{regra['descricao']}</b> <span style='font-size:0.97em;color:#777;'>({regra['categoria']})</span>",
+                            unsafe_allow_html=True)
+            with col2:
+                st.markdown(formatar_brl(regra["centavos"] / 100), unsafe_allow_html=True)
+            with col3:
+                periodo = f"até {regra['fim']:%d/%m/%Y}" if regra["fim"] else "sem data de fim"
+                st.markdown(f"Todo dia <b>{regra['dia']}</b>, desde {regra['inicio']:%m/%Y}, {periodo}", unsafe_allow_html=True)
+            with col4:
+                if st.button("🗑️", key=f"excluir_recorrente_{regra['id']}"):
+                    dados.remover_recorrente(worksheet_recorrentes, regra["id"])
+                    recarregar_recorrentes()
+                    st.success(f"Regra '{regra['descricao']}' removida!")
+                    st.rerun()
+    else:
+        st.info("Nenhuma regra cadastrada.")
+
+    st.divider()
+    st.subheader("Próximos vencimentos (e atrasados)")
+    # Só estas ocorrências existem em memória; ao pagar, viram uma linha em Transacoes
+    pendentes = recorrentes.proximas(st.session_state.recorrentes, st.session_state.lancadas)
+    if pendentes:
+        for idx, oc in enumerate(pendentes):
+            col1, col2, col3, col4 = st.columns([2,5,2,2])
+            with col1:
+                st.markdown(date.fromisoformat(oc["Data Vencimento"]).strftime("%d/%m/%Y"))
+            with col2:
+                st.markdown(f"<b>{oc['Descrição']}</b>", unsafe_allow_html=True)
+            with col3:
+                st.markdown(formatar_brl(oc["Valor"]), unsafe_allow_html=True)
+            with col4:
+                if st.button("✅ Pago", key=f"pagar_recorrente_{idx}_{oc['Fingerprint']}"):
+                    dados.materializar_ocorrencia(worksheet, oc, date.today())
+                    recarregar_transacoes()
+                    st.success(f"'{oc['Descrição']}' marcada como paga!")
+                    st.rerun()
+    else:
+        st.info("Nenhuma ocorrência pendente nos próximos 30 dias.")
+
 elif st.session_state.pagina == "Dashboard":
     dashboard_financeiro()
 
@@ -532,8 +550,8 @@ elif st.session_state.pagina == "Cartões":
             if not nome_cartao or not limite_cartao or not vencimento:
                 st.warning("Preencha todos os campos.")
             else:
-                adicionar_cartao(nome_cartao, normaliza_valor(limite_cartao), vencimento)
-                st.session_state.cartoes = ler_cartoes()
+                dados.adicionar_cartao(worksheet_cartoes, nome_cartao, limite_cartao, vencimento)
+                st.session_state.cartoes = dados.ler_cartoes(worksheet_cartoes)
                 st.success(f"Cartão '{nome_cartao}' cadastrado!")
                 st.rerun()
 
@@ -556,14 +574,8 @@ elif st.session_state.pagina == "Cartões":
                 )
             with col4:
                 if st.button("🗑️", key=f"excluir_cartao_{idx}"):
-                    todas = worksheet_cartoes.get_all_records()
-                    for i, c in enumerate(todas, start=2):
-                        if (c.get("Nome") == cartao["nome"]
-                            and float(normaliza_valor(c.get("Limite",0))) == cartao["limite"]
-                            and str(c.get("Vencimento")) == str(cartao.get("vencimento", ""))):
-                            worksheet_cartoes.delete_rows(i)
-                            break
-                    st.session_state.cartoes = ler_cartoes()
+                    dados.remover_cartao(worksheet_cartoes, cartao)
+                    st.session_state.cartoes = dados.ler_cartoes(worksheet_cartoes)
                     st.success(f"Cartão '{cartao['nome']}' removido!")
                     st.rerun()
             st.markdown('<div class="cartao-box"></div>', unsafe_allow_html=True)
@@ -590,17 +602,18 @@ elif st.session_state.pagina == "Cartões":
                 if not cartao or not valor or not descricao:
                     st.warning("Preencha todos os campos da compra.")
                 else:
-                    adicionar_transacao(
+                    dados.adicionar_transacao(
+                        worksheet,
                         data_compra,
                         data_compra if pago == "S" else "",
                         descricao,
-                        float(normaliza_valor(valor)),
+                        valor,
                         cartao,
                         "Saída",
                         telefone,
                         pago
                     )
-                    st.session_state.transacoes = ler_transacoes()
+                    recarregar_transacoes()
                     st.success("Compra lançada com sucesso!")
                     st.rerun()
     else:
@@ -608,9 +621,8 @@ elif st.session_state.pagina == "Cartões":
 
     st.divider()
     st.subheader("Faturas e compras dos cartões")
-    df = pd.DataFrame(st.session_state.transacoes, columns=cols)
+    df = pd.DataFrame(st.session_state.transacoes, columns=cols + ["Centavos"])
     if not df.empty and cartoes:
-        df["Valor"] = df["Valor"].apply(lambda x: float(normaliza_valor(x)))
         df["Data Vencimento"] = pd.to_datetime(df["Data Vencimento"], errors="coerce")
         df["mes_ano"] = df["Data Vencimento"].dt.strftime("%m/%Y")
         df = df[df["Tipo"] == "Saída"]
@@ -627,7 +639,7 @@ elif st.session_state.pagina == "Cartões":
                     )
                 for mesano in sorted(compras_cartao["mes_ano"].unique(), reverse=True):
                     df_mes = compras_cartao[compras_cartao["mes_ano"] == mesano]
-                    total = df_mes["Valor"].sum()
+                    total = df_mes["Centavos"].sum() / 100
                     st.markdown(f"<div class='fatura-mes'>{mesano} | Total: {formatar_brl(total)}</div>", unsafe_allow_html=True)
                     st.table(
                         df_mes[["Data Vencimento", "Descrição", "Valor"]]
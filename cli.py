@@ -0,0 +1,187 @@
+"""Operações em lote na planilha, sem abrir o Streamlit.
+
+Exemplos:
+    python cli.py importar extrato.csv --categoria-padrao Outros
+    python cli.py adicionar --data 2024-05-10 --descricao "Conta de luz" --valor 120,50 --tipo Saída --categoria "Gastos Fixos"
+    python cli.py remover --categoria Lazer --de 2023-01-01 --ate 2023-12-31 --sim
+    python cli.py exportar --mes 2024-05 --saida maio.csv
+    python cli.py resumo --de 2024-01-01
+
+As credenciais vêm de --credenciais, de GOOGLE_APPLICATION_CREDENTIALS ou
+do .streamlit/secrets.toml (ver dados.carregar_credenciais).
+"""
+import argparse
+import csv
+import sys
+from collections import Counter, defaultdict
+from datetime import date
+
+import dados
+import importacao
+from valores import centavos_para_str, para_centavos
+
+def _data(texto):
+    try:
+        return date.fromisoformat(texto)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"data inválida (use AAAA-MM-DD): {texto}")
+
+def _brl(centavos):
+    return f"R$ {centavos / 100:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+def filtra(transacoes, args):
+    """Aplica os filtros comuns (--descricao, --categoria, --mes, --de, --ate) numa única passada."""
+    busca = args.descricao.lower() if args.descricao else None
+    for t in transacoes:
+        if busca and busca not in str(t.get("Descrição", "")).lower():
+            continue
+        if args.categoria and t.get("Categoria") != args.categoria:
+            continue
+        venc = str(t.get("Data Vencimento", ""))[:10]
+        if args.mes and not venc.startswith(args.mes):
+            continue
+        if args.de and venc < args.de.isoformat():
+            continue
+        if args.ate and venc > args.ate.isoformat():
+            continue
+        yield t
+
+def cmd_importar(args, worksheet):
+    regras = importacao.parse_regras(importacao.REGRAS_PADRAO)
+    if args.regras:
+        with open(args.regras, encoding="utf-8") as f:
+            regras = importacao.parse_regras(f.read())
+    estatisticas = Counter()
+    indice = importacao.indice_importacao(dados.ler_transacoes(worksheet))
+    with open(args.arquivo, "rb") as arquivo, importacao.abre_extrato(arquivo) as texto:
+        registros = importacao.ler_extrato(texto, args.arquivo, estatisticas)
+        transacoes = importacao.para_transacoes(registros, regras, args.categoria_padrao,
+                                                args.telefone, args.inverter_sinal)
+        novas = importacao.filtra_novas(transacoes, indice, estatisticas)
+        gravadas = importacao.importa(
+            novas, dados.COLUNAS, lambda linhas: dados.adicionar_transacoes_lote(worksheet, linhas),
+            ao_progredir=lambda n: print(f"{n} gravada(s)...", file=sys.stderr),
+        )
+    print(f"{gravadas} transação(ões) importada(s), {estatisticas['duplicadas']} duplicada(s), "
+          f"{estatisticas['ignoradas']} linha(s) ignorada(s).")
+
+def cmd_adicionar(args, worksheet):
+    dados.adicionar_transacao(
+        worksheet, args.data, args.data if args.pago == "S" else "", args.descricao,
+        args.valor, args.categoria, args.tipo, args.telefone, args.pago,
+    )
+    print("Transação registrada.")
+
+def cmd_remover(args, worksheet):
+    transacoes = dados.ler_transacoes(worksheet)
+    alvos = list(filtra(transacoes, args))
+    total = sum(t["Centavos"] for t in alvos)
+    print(f"{len(alvos)} transação(ões) selecionada(s), total {_brl(total)}.")
+    if not alvos:
+        return
+    if not args.sim:
+        print("Nada foi removido; repita com --sim para confirmar.")
+        return
+    # Reaproveita a leitura acima para achar as linhas, sem ler a planilha de novo
+    removidos, nao_encontrados = dados.remover_transacoes(worksheet, [t["Fingerprint"] for t in alvos], transacoes)
+    print(f"{removidos} transação(ões) removida(s).")
+    if nao_encontrados:
+        print(f"{len(nao_encontrados)} não encontrada(s) (a planilha mudou durante a operação?).")
+
+def cmd_exportar(args, worksheet):
+    saida = open(args.saida, "w", newline="", encoding="utf-8") if args.saida else sys.stdout
+    try:
+        escritor = csv.writer(saida)
+        escritor.writerow(dados.COLUNAS)
+        n = 0
+        for t in filtra(dados.ler_transacoes(worksheet), args):
+            # Valor sai no formato da planilha, direto dos centavos
+            escritor.writerow([centavos_para_str(t["Centavos"]) if c == "Valor" else t.get(c, "")
+                               for c in dados.COLUNAS])
+            n += 1
+    finally:
+        if args.saida:
+            saida.close()
+    print(f"{n} transação(ões) exportada(s).", file=sys.stderr)
+
+def resumo_mensal(transacoes):
+    """Agrupa por mês de vencimento: {"AAAA-MM": [entradas, saídas, quantidade]} em centavos."""
+    meses = defaultdict(lambda: [0, 0, 0])
+    for t in transacoes:
+        mes = str(t.get("Data Vencimento", ""))[:7] or "sem data"
+        centavos = t["Centavos"]
+        meses[mes][0 if centavos > 0 else 1] += centavos
+        meses[mes][2] += 1
+    return dict(sorted(meses.items()))
+
+def cmd_resumo(args, worksheet):
+    resumo = resumo_mensal(filtra(dados.ler_transacoes(worksheet), args))
+    print(f"{'Mês':<9} {'Entradas':>16} {'Saídas':>16} {'Saldo':>16} {'Qtd':>6}")
+    for mes, (entradas, saidas, qtd) in resumo.items():
+        print(f"{mes:<9} {_brl(entradas):>16} {_brl(abs(saidas)):>16} {_brl(entradas + saidas):>16} {qtd:>6}")
+
+def _adiciona_filtros(parser):
+    parser.add_argument("--descricao", help="trecho da descrição (sem diferenciar maiúsculas)")
+    parser.add_argument("--categoria")
+    parser.add_argument("--mes", help="AAAA-MM")
+    parser.add_argument("--de", type=_data, help="vencimento a partir de AAAA-MM-DD")
+    parser.add_argument("--ate", type=_data, help="vencimento até AAAA-MM-DD")
+
+def cria_parser():
+    parser = argparse.ArgumentParser(description="Controle de Finanças pela linha de comando")
+    parser.add_argument("--credenciais", help="JSON da service account do Google")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p = sub.add_parser("importar", help="importa um extrato CSV/OFX, ignorando o que já existe")
+    p.add_argument("arquivo")
+    p.add_argument("--categoria-padrao", default="Outros")
+    p.add_argument("--regras", help="arquivo com regras trecho=Categoria, uma por linha")
+    p.add_argument("--telefone", default="")
+    p.add_argument("--inverter-sinal", action="store_true", help="gastos vêm positivos (fatura de cartão)")
+    p.set_defaults(func=cmd_importar)
+
+    p = sub.add_parser("adicionar", help="adiciona uma transação")
+    p.add_argument("--data", type=_data, default=date.today(), help="vencimento AAAA-MM-DD (padrão: hoje)")
+    p.add_argument("--descricao", required=True)
+    p.add_argument("--valor", required=True, help="ex: 14,98 ou 1.234,56")
+    p.add_argument("--categoria", default="Outros")
+    p.add_argument("--tipo", choices=["Entrada", "Saída"], default="Saída")
+    p.add_argument("--telefone", default="")
+    p.add_argument("--pago", choices=["N", "S"], default="N")
+    p.set_defaults(func=cmd_adicionar)
+
+    p = sub.add_parser("remover", help="remove as transações que passam nos filtros")
+    _adiciona_filtros(p)
+    p.add_argument("--sim", action="store_true", help="confirma a remoção (sem isso só mostra a contagem)")
+    p.set_defaults(func=cmd_remover)
+
+    p = sub.add_parser("exportar", help="exporta transações em CSV")
+    _adiciona_filtros(p)
+    p.add_argument("--saida", help="arquivo de saída (padrão: tela)")
+    p.set_defaults(func=cmd_exportar)
+
+    p = sub.add_parser("resumo", help="entradas, saídas e saldo por mês")
+    _adiciona_filtros(p)
+    p.set_defaults(func=cmd_resumo)
+    return parser
+
+def main(argv=None):
+    args = cria_parser().parse_args(argv)
+    if args.comando == "remover" and not any([args.descricao, args.categoria, args.mes, args.de, args.ate]):
+        print("Informe ao menos um filtro para remover.", file=sys.stderr)
+        return 2
+    if args.comando == "adicionar":
+        # Mesmas regras do formulário da tela Principal
+        try:
+            centavos = para_centavos(args.valor)
+        except ValueError:
+            centavos = None
+        if centavos is None or centavos <= 0:
+            print("Valor inválido: informe um número maior que zero (ex: 14,98 ou 1.234,56).", file=sys.stderr)
+            return 2
+    worksheet, _, _ = dados.conectar(dados.carregar_credenciais(args.credenciais))
+    args.func(args, worksheet)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+"""Acesso à planilha do Google Sheets, sem depender do Streamlit.
+
+Usado pelo app (credenciais em st.secrets) e pela linha de comando (cli.py).
+"""
+import json
+import os
+import uuid
+from datetime import date
+
+import gspread
+from google.oauth2.service_account import Credentials
+
+from valores import para_centavos, centavos_para_str, fingerprint_transacao, indice_fingerprints
+
+SCOPE = [
+    'https://www.googleapis.com/auth/spreadsheets',
+    'https://www.googleapis.com/auth/drive'
+]
+SHEET_NAME = 'Controle finanças'
+WORKSHEET_TRANSACOES = 'Transacoes'
+WORKSHEET_CARTOES = 'Cartoes'
+WORKSHEET_RECORRENTES = 'Recorrentes'
+ARQUIVO_SECRETS = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".streamlit", "secrets.toml")
+
+COLUNAS = ["Data Vencimento", "Data Pagamento", "Descrição", "Valor", "Categoria", "Tipo", "Telefone", "Pago"]
+COLUNAS_RECORRENTES = ["ID", "Descrição", "Valor", "Categoria", "Tipo", "Dia", "Início", "Fim", "Telefone"]
+
+def carregar_credenciais(caminho=None):
+    """Lê as credenciais da service account fora do Streamlit.
+
+    Ordem: `caminho` (JSON da service account), variável de ambiente
+    GOOGLE_APPLICATION_CREDENTIALS e, por fim, a seção
+    [google_service_account] do .streamlit/secrets.toml.
+    """
+    caminho = caminho or os.environ.get("GOOGLE_APPLICATION_CREDENTIALS")
+    if caminho:
+        with open(caminho, encoding="utf-8") as f:
+            return json.load(f)
+    try:
+        import tomllib
+    except ModuleNotFoundError:  # Python <= 3.10
+        import tomli as tomllib
+    with open(ARQUIVO_SECRETS, "rb") as f:
+        return tomllib.load(f)["google_service_account"]
+
+def _abre_ou_cria(sheet, titulo, cabecalho):
+    try:
+        return sheet.worksheet(titulo)
+    except gspread.exceptions.WorksheetNotFound:
+        ws = sheet.add_worksheet(title=titulo, rows="100", cols=str(len(cabecalho)))
+        ws.append_row(cabecalho)
+        return ws
+
+def conectar(info_credenciais):
+    """Abre a planilha e devolve as worksheets de transações, cartões e recorrentes."""
+    creds = Credentials.from_service_account_info(info_credenciais, scopes=SCOPE)
+    gc = gspread.authorize(creds)
+    sheet = gc.open(SHEET_NAME)
+    worksheet = sheet.worksheet(WORKSHEET_TRANSACOES)
+    worksheet_cartoes = _abre_ou_cria(sheet, WORKSHEET_CARTOES, ["Nome", "Limite", "Vencimento"])
+    worksheet_recorrentes = _abre_ou_cria(sheet, WORKSHEET_RECORRENTES, COLUNAS_RECORRENTES)
+    return worksheet, worksheet_cartoes, worksheet_recorrentes
+
+# ========== Transações ==========
+
+def ler_transacoes(worksheet):
+    # Lê tudo como texto (sem numericise) para o fingerprint bater com get_all_values()
+    rows = worksheet.get_all_records(numericise_ignore=["all"])
+    for row in rows:
+        row["Fingerprint"] = fingerprint_transacao(row)
+        try:
+            row["Centavos"] = para_centavos(row["Valor"])
+        except ValueError:
+            row["Centavos"] = 0
+        row["Valor"] = row["Centavos"] / 100
+    return rows if rows else []
+
+def linha_transacao(data_vencimento, data_pagamento, descricao, valor, categoria, tipo, telefone="", pago="N"):
+    centavos = abs(para_centavos(valor))
+    valor_final_str = centavos_para_str(centavos if tipo == "Entrada" else -centavos)
+    return [
+        str(data_vencimento) if data_vencimento else "",
+        str(data_pagamento) if data_pagamento else "",
+        descricao,
+        valor_final_str,
+        categoria,
+        tipo,
+        telefone,
+        pago
+    ]
+
+def adicionar_transacao(worksheet, data_vencimento, data_pagamento, descricao, valor, categoria, tipo, telefone="", pago="N"):
+    worksheet.append_row(linha_transacao(data_vencimento, data_pagamento, descricao, valor, categoria, tipo, telefone, pago))
+
+def adicionar_transacoes_lote(worksheet, linhas):
+    # Uma chamada à API por lote, em vez de um append_row por transação
+    if linhas:
+        worksheet.append_rows(linhas)
+
+def _faixas_descendentes(numeros):
+    # [3, 4, 5, 9] -> [(9, 9), (3, 5)]: linhas vizinhas saem numa chamada só
+    faixas = []
+    for n in sorted(set(numeros), reverse=True):
+        if faixas and faixas[-1][0] == n + 1:
+            faixas[-1] = (n, faixas[-1][1])
+        else:
+            faixas.append((n, n))
+    return faixas
+
+def remover_transacoes(worksheet, fingerprints, transacoes=None):
+    """Remove da planilha as linhas com os fingerprints informados.
+
+    Cada fingerprint remove uma linha (repita-o para remover duplicatas).
+    Se `transacoes` (resultado completo de ler_transacoes) for passado, as
+    linhas saem dele, sem ler a planilha de novo.
+    Devolve (quantidade removida, fingerprints não encontrados).
+    """
+    if transacoes is None:
+        all_rows = worksheet.get_all_values()[1:]  # Ignora cabeçalho
+        indice = indice_fingerprints(all_rows, COLUNAS)
+    else:
+        indice = {}
+        for num, t in enumerate(transacoes, start=2):
+            indice.setdefault(t["Fingerprint"], []).append(num)
+    linhas_remover = []
+    nao_encontrados = []
+    for fp in fingerprints:
+        # Linhas duplicadas compartilham o fingerprint: cada pedido consome uma
+        linhas = indice.get(fp)
+        if linhas:
+            linhas_remover.append(linhas.pop())
+        else:
+            nao_encontrados.append(fp)
+    # De baixo para cima, para não deslocar as linhas que ainda serão apagadas
+    for inicio, fim in _faixas_descendentes(linhas_remover):
+        worksheet.delete_rows(inicio, fim)
+    return len(linhas_remover), nao_encontrados
+
+# ========== Cartões ==========
+
+def ler_cartoes(worksheet_cartoes):
+    rows = worksheet_cartoes.get_all_records()
+    return [
+        {
+            "nome": r.get("Nome"),
+            "limite": para_centavos(r.get("Limite")) / 100,
+            "limite_centavos": para_centavos(r.get("Limite")),
+            "vencimento": int(r.get("Vencimento", 0)) if str(r.get("Vencimento", "")).isdigit() else ""
+        }
+        for r in rows if r.get("Nome")
+    ]
+
+def adicionar_cartao(worksheet_cartoes, nome, limite, vencimento):
+    worksheet_cartoes.append_row([nome, centavos_para_str(para_centavos(limite)), str(vencimento)])
+
+def remover_cartao(worksheet_cartoes, cartao):
+    todas = worksheet_cartoes.get_all_records()
+    for i, c in enumerate(todas, start=2):
+        if (c.get("Nome") == cartao["nome"]
+            and para_centavos(c.get("Limite", 0)) == cartao["limite_centavos"]
+            and str(c.get("Vencimento")) == str(cartao.get("vencimento", ""))):
+            worksheet_cartoes.delete_rows(i)
+            return True
+    return False
+
+# ========== Recorrentes ==========
+
+def ler_recorrentes(worksheet_recorrentes):
+    regras = []
+    for r in worksheet_recorrentes.get_all_records(numericise_ignore=["all"]):
+        try:
+            centavos = abs(para_centavos(r.get("Valor")))
+            regras.append({
+                "id": r.get("ID"),
+                "descricao": str(r.get("Descrição", "")).strip(),
+                "centavos": centavos if r.get("Tipo") == "Entrada" else -centavos,
+                "categoria": r.get("Categoria", ""),
+                "tipo": r.get("Tipo", ""),
+                "dia": int(r.get("Dia")),
+                "inicio": date.fromisoformat(str(r.get("Início"))[:10]),
+                "fim": date.fromisoformat(str(r["Fim"])[:10]) if r.get("Fim") else None,
+                "telefone": r.get("Telefone", ""),
+            })
+        except (ValueError, TypeError):
+            continue  # Regra incompleta na planilha: ignora
+    return regras
+
+def adicionar_recorrente(worksheet_recorrentes, descricao, valor, categoria, tipo, dia, inicio, fim=None, telefone=""):
+    # O valor fica positivo; o sinal sai do Tipo, como em linha_transacao
+    worksheet_recorrentes.append_row([
+        uuid.uuid4().hex[:8],
+        descricao,
+        centavos_para_str(abs(para_centavos(valor))),
+        categoria,
+        tipo,
+        str(int(dia)),
+        str(inicio),
+        str(fim) if fim else "",
+        telefone,
+    ])
+
+def remover_recorrente(worksheet_recorrentes, id_regra):
+    ids = worksheet_recorrentes.col_values(1)
+    for i, valor in enumerate(ids[1:], start=2):
+        if valor == id_regra:
+            worksheet_recorrentes.delete_rows(i)
+            return True
+    return False
+
+def materializar_ocorrencia(worksheet, ocorrencia, data_pagamento):
+    """Grava em Transacoes, como paga, uma ocorrência gerada por recorrentes.expandir."""
+    adicionar_transacao(
+        worksheet, ocorrencia["Data Vencimento"], data_pagamento, ocorrencia["Descrição"],
+        centavos_para_str(abs(ocorrencia["Centavos"])), ocorrencia["Categoria"], ocorrencia["Tipo"],
+        ocorrencia["Telefone"], "S",
+    )
@@ -0,0 +1,274 @@
+import codecs
+import csv
+import html
+import io
+import re
+import unicodedata
+from collections import Counter
+from contextlib import contextmanager
+from datetime import date, datetime
+from itertools import islice
+
+from valores import CAMPOS_LANCAMENTO, para_centavos, centavos_para_str, fingerprint_transacao
+
+# Para detectar duplicatas só data, descrição e valor importam: a categoria
+# depende das regras e pode mudar entre uma importação e outra
+CAMPOS_IMPORTACAO = CAMPOS_LANCAMENTO
+
+TAMANHO_LOTE = 500
+
+REGRAS_PADRAO = """\
+uber=Transporte
+99app=Transporte
+posto=Transporte
+ifood=Alimentação
+mercado=Alimentação
+padaria=Alimentação
+restaurante=Alimentação
+netflix=Lazer
+spotify=Lazer
+cinema=Lazer
+aluguel=Gastos Fixos
+energia=Gastos Fixos
+internet=Gastos Fixos
+salario=Salário"""
+
+# Nomes de coluna aceitos nos CSVs dos bancos (sem acento, minúsculos)
+ALIASES_CSV = {
+    "data": ["data", "date", "data lancamento", "data movimento", "data da compra", "data transacao"],
+    "descricao": ["descricao", "title", "historico", "lancamento", "memo", "estabelecimento", "detalhes"],
+    "valor": ["valor", "amount", "valor (r$)", "valor r$", "quantia"],
+}
+
+FORMATOS_DATA = ["%Y-%m-%d", "%d/%m/%Y", "%d/%m/%y", "%d-%m-%Y", "%Y%m%d"]
+
+def _sem_acento(texto):
+    texto = unicodedata.normalize("NFKD", str(texto))
+    return "".join(c for c in texto if not unicodedata.combining(c)).lower().strip()
+
+def parse_data(texto):
+    texto = str(texto).strip()
+    # OFX: 20240115120000[-3:BRT] -> só a parte da data importa
+    if len(texto) > 8 and texto[:8].isdigit():
+        texto = texto[:8]
+    for formato in FORMATOS_DATA:
+        try:
+            return datetime.strptime(texto, formato).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Data inválida: {texto!r}")
+
+def valor_extrato(texto):
+    """Converte o valor de um extrato em centavos, aceitando "1.234,56" e "1,234.56".
+
+    Com os dois separadores, o último é o decimal. Com um só, ele é decimal
+    se aparecer uma vez e não tiver exatamente três dígitos depois ("1.234"
+    pode ser mil ou um real); repetido ("1.234.567"), é de milhar. Valores
+    ambíguos levantam ValueError em vez de virar um número errado.
+    """
+    limpo = str(texto).replace(" ", "").replace("\xa0", "").replace("R$", "").strip()
+    ultimo_ponto, ultima_virgula = limpo.rfind("."), limpo.rfind(",")
+    if ultimo_ponto >= 0 and ultima_virgula >= 0:
+        decimal = "." if ultimo_ponto > ultima_virgula else ","
+        milhar = "," if decimal == "." else "."
+        if limpo.count(decimal) > 1 or limpo.find(milhar) > limpo.find(decimal):
+            raise ValueError(f"Valor inválido: {texto!r}")
+        limpo = limpo.replace(milhar, "").replace(decimal, ".")
+    elif ultimo_ponto >= 0 or ultima_virgula >= 0:
+        separador = "." if ultimo_ponto >= 0 else ","
+        partes = limpo.split(separador)
+        if len(partes) > 2:
+            limpo = "".join(partes)
+        elif len(partes[1]) == 3:
+            raise ValueError(f"Valor ambíguo: {texto!r}")
+        else:
+            limpo = ".".join(partes)
+    # Só sobra um ponto decimal, que a regra de para_centavos não altera
+    return para_centavos(limpo)
+
+def parse_regras(texto):
+    """Lê regras no formato "trecho=Categoria", uma por linha.
+
+    A primeira regra cujo trecho aparece na descrição define a categoria.
+    """
+    regras = []
+    for linha in str(texto).splitlines():
+        if "=" not in linha or linha.strip().startswith("#"):
+            continue
+        trecho, categoria = linha.split("=", 1)
+        if trecho.strip() and categoria.strip():
+            regras.append((_sem_acento(trecho), categoria.strip()))
+    return regras
+
+def categoriza(descricao, regras, padrao="Outros"):
+    descricao = _sem_acento(descricao)
+    for trecho, categoria in regras:
+        if trecho in descricao:
+            return categoria
+    return padrao
+
+def _detecta_encoding(arquivo, tamanho_bloco=65536):
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    try:
+        while True:
+            bloco = arquivo.read(tamanho_bloco)
+            if not bloco:
+                decoder.decode(b"", final=True)
+                return "utf-8-sig"
+            decoder.decode(bloco, final=False)
+    except UnicodeDecodeError:
+        return "latin-1"
+    finally:
+        arquivo.seek(0)
+
+@contextmanager
+def abre_extrato(arquivo):
+    """Abre o arquivo enviado (binário) como texto, sem carregá-lo inteiro.
+
+    O encoding é escolhido antes de qualquer gravação: o arquivo todo é
+    validado como UTF-8 em blocos e, se algum byte não bater, usa Latin-1
+    (comum em extratos de bancos brasileiros), que aceita qualquer byte.
+    O arquivo original não é fechado.
+    """
+    encoding = _detecta_encoding(arquivo)
+    texto = io.TextIOWrapper(arquivo, encoding=encoding, newline="")
+    try:
+        yield texto
+    finally:
+        texto.detach()
+
+def _mapeia_cabecalho(cabecalho):
+    normalizado = [_sem_acento(c) for c in cabecalho]
+    mapa = {}
+    for campo, aliases in ALIASES_CSV.items():
+        for i, nome in enumerate(normalizado):
+            if nome in aliases:
+                mapa[campo] = i
+                break
+    faltando = [campo for campo in ALIASES_CSV if campo not in mapa]
+    if faltando:
+        raise ValueError(f"Colunas não encontradas no CSV: {', '.join(faltando)}")
+    return mapa
+
+def ler_csv(texto, estatisticas=None):
+    estatisticas = estatisticas if estatisticas is not None else Counter()
+    amostra = texto.read(4096)
+    texto.seek(0)
+    try:
+        dialeto = csv.Sniffer().sniff(amostra, delimiters=";,\t")
+    except csv.Error:
+        dialeto = csv.excel
+    leitor = csv.reader(texto, dialeto)
+    cabecalho = next(leitor, None)
+    if not cabecalho:
+        return
+    mapa = _mapeia_cabecalho(cabecalho)
+    for linha in leitor:
+        if not any(c.strip() for c in linha):
+            continue
+        estatisticas["lidas"] += 1
+        try:
+            yield {
+                "data": parse_data(linha[mapa["data"]]),
+                "descricao": linha[mapa["descricao"]].strip(),
+                "centavos": valor_extrato(linha[mapa["valor"]]),
+            }
+        except (ValueError, IndexError):
+            estatisticas["ignoradas"] += 1
+
+_TAG_OFX = re.compile(r"<(/?[A-Za-z0-9.]+)>([^<\r\n]*)")
+
+def ler_ofx(texto, estatisticas=None):
+    # OFX 1.x é SGML (tags sem fechamento); por isso a leitura é por tag, não por XML
+    estatisticas = estatisticas if estatisticas is not None else Counter()
+    atual = None
+    for linha in texto:
+        for tag, valor in _TAG_OFX.findall(linha):
+            tag = tag.upper()
+            if tag == "STMTTRN":
+                atual = {}
+            elif tag == "/STMTTRN" and atual is not None:
+                estatisticas["lidas"] += 1
+                try:
+                    yield {
+                        "data": parse_data(atual.get("DTPOSTED", "")),
+                        # SGML mantém entidades ("&amp;"); decodifica antes de categorizar
+                        "descricao": html.unescape(atual.get("MEMO") or atual.get("NAME", "")),
+                        "centavos": valor_extrato(atual.get("TRNAMT", "")),
+                    }
+                except ValueError:
+                    estatisticas["ignoradas"] += 1
+                atual = None
+            elif atual is not None and not tag.startswith("/"):
+                atual[tag] = valor.strip()
+
+def ler_extrato(texto, nome_arquivo, estatisticas=None):
+    if str(nome_arquivo).lower().endswith((".ofx", ".qfx")):
+        return ler_ofx(texto, estatisticas)
+    return ler_csv(texto, estatisticas)
+
+def para_transacoes(registros, regras, categoria_padrao="Outros", telefone="", inverte_sinal=False):
+    """Converte registros do extrato em transações no formato da planilha.
+
+    Lançamentos de extrato já aconteceram, então entram como pagos, com a
+    data de pagamento igual à de vencimento.
+    """
+    for reg in registros:
+        centavos = -reg["centavos"] if inverte_sinal else reg["centavos"]
+        if centavos == 0:
+            continue
+        data_str = reg["data"].isoformat() if isinstance(reg["data"], date) else str(reg["data"])
+        yield {
+            "Data Vencimento": data_str,
+            "Data Pagamento": data_str,
+            "Descrição": reg["descricao"],
+            "Valor": centavos_para_str(centavos),
+            "Categoria": categoriza(reg["descricao"], regras, categoria_padrao),
+            "Tipo": "Entrada" if centavos > 0 else "Saída",
+            "Telefone": telefone,
+            "Pago": "S",
+        }
+
+def indice_importacao(transacoes):
+    return Counter(fingerprint_transacao(t, CAMPOS_IMPORTACAO) for t in transacoes)
+
+def filtra_novas(transacoes, indice, estatisticas=None):
+    """Descarta transações que já estão no livro.
+
+    `indice` conta quantas vezes cada fingerprint já existe; cada ocorrência
+    no livro "consome" uma no extrato. Assim duas compras iguais no mesmo dia
+    continuam sendo duas, e reimportar o mesmo arquivo não duplica nada.
+    """
+    estatisticas = estatisticas if estatisticas is not None else Counter()
+    restantes = Counter(indice)
+    for t in transacoes:
+        fp = fingerprint_transacao(t, CAMPOS_IMPORTACAO)
+        if restantes[fp] > 0:
+            restantes[fp] -= 1
+            estatisticas["duplicadas"] += 1
+            continue
+        yield t
+
+def em_lotes(iteravel, tamanho=TAMANHO_LOTE):
+    iterador = iter(iteravel)
+    while True:
+        lote = list(islice(iterador, tamanho))
+        if not lote:
+            return
+        yield lote
+
+def importa(transacoes, colunas, escreve_lote, tamanho_lote=TAMANHO_LOTE, ao_progredir=None, estatisticas=None):
+    """Grava as transações em lotes com `escreve_lote(linhas)` e devolve o total gravado.
+
+    `estatisticas["gravadas"]` acompanha o total a cada lote, para saber
+    quanto já foi gravado se a importação falhar no meio.
+    """
+    estatisticas = estatisticas if estatisticas is not None else Counter()
+    gravadas = 0
+    for lote in em_lotes(transacoes, tamanho_lote):
+        escreve_lote([[t.get(c, "") for c in colunas] for t in lote])
+        gravadas += len(lote)
+        estatisticas["gravadas"] = gravadas
+        if ao_progredir:
+            ao_progredir(gravadas)
+    return gravadas
@@ -0,0 +1,242 @@
+import heapq
+import json
+import logging
+import os
+import threading
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from itertools import chain
+
+import recorrentes
+from valores import para_centavos, fingerprint_transacao
+
+# O aviso sai às HORA_AVISO, DIAS_ANTECEDENCIA dia(s) antes do vencimento
+DIAS_ANTECEDENCIA = 1
+HORA_AVISO = time(9, 0)
+# Ocorrências recorrentes entram no heap só até este número de dias à frente;
+# a janela é reexpandida pelo próprio agendador a cada virada de dia
+DIAS_RECORRENTES = DIAS_ANTECEDENCIA + 31
+
+logger = logging.getLogger("lembretes")
+
+# ========== Notificadores ==========
+# Qualquer objeto com enviar(telefone, mensagem) serve (WhatsApp, SMS...).
+
+class NotificadorLog:
+    def enviar(self, telefone, mensagem):
+        logger.info("Lembrete para %s:\n%s", telefone, mensagem)
+
+class NotificadorArquivo:
+    def __init__(self, caminho):
+        self.caminho = caminho
+
+    def enviar(self, telefone, mensagem):
+        with open(self.caminho, "a", encoding="utf-8") as f:
+            f.write(f"[{datetime.now():%Y-%m-%d %H:%M}] {telefone}\n{mensagem}\n\n")
+
+class RegistroEnviados:
+    """Guarda em arquivo (JSON por linha) os lembretes já enviados."""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.chaves = set()
+        if os.path.exists(caminho):
+            with open(caminho, encoding="utf-8") as f:
+                for linha in f:
+                    try:
+                        self.chaves.add(json.loads(linha)["chave"])
+                    except (ValueError, KeyError):
+                        continue
+
+    def __contains__(self, chave):
+        return chave in self.chaves
+
+    def registrar(self, chaves, telefone):
+        with open(self.caminho, "a", encoding="utf-8") as f:
+            for chave in chaves:
+                f.write(json.dumps({"chave": chave, "telefone": telefone,
+                                    "enviado_em": datetime.now().isoformat(timespec="seconds")}) + "\n")
+        self.chaves.update(chaves)
+
+# ========== Agendador ==========
+
+def _data_vencimento(transacao):
+    texto = str(transacao.get("Data Vencimento", "")).strip()[:10]
+    try:
+        return date.fromisoformat(texto)
+    except ValueError:
+        return None
+
+def horario_aviso(transacao):
+    vencimento = _data_vencimento(transacao)
+    if vencimento is None:
+        return None
+    return datetime.combine(vencimento - timedelta(days=DIAS_ANTECEDENCIA), HORA_AVISO)
+
+def precisa_aviso(transacao):
+    return (str(transacao.get("Pago", "")).strip().upper() != "S"
+            and bool(str(transacao.get("Telefone", "")).strip()))
+
+def _linha_mensagem(transacao):
+    centavos = abs(para_centavos(transacao.get("Valor")))
+    valor = f"R$ {centavos / 100:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+    return f"- {transacao.get('Descrição', '')}: {valor} vence em {_data_vencimento(transacao):%d/%m/%Y}"
+
+def monta_mensagem(transacoes):
+    linhas = [_linha_mensagem(t) for t in sorted(transacoes, key=_data_vencimento)]
+    return f"💸 Lembrete: {len(linhas)} conta(s) a pagar\n" + "\n".join(linhas)
+
+class AgendadorLembretes:
+    """Envia lembretes de vencimento das transações não pagas.
+
+    As transações pendentes ficam num heap ordenado pelo horário do aviso; a
+    thread dorme até o topo do heap vencer (ou até `sincronizar` mudar o
+    topo) e só então processa os avisos devidos. Entradas que deixaram de
+    valer (pagas, removidas) são descartadas quando chegam ao topo.
+
+    As regras recorrentes ficam guardadas junto com as transações: a cada
+    dia a thread acorda e reexpande a janela de DIAS_RECORRENTES, então o
+    mês seguinte entra no heap mesmo que ninguém abra o app.
+    """
+
+    def __init__(self, notificador, registro, agora=datetime.now):
+        self.notificador = notificador
+        self.registro = registro
+        self.agora = agora
+        self._heap = []
+        self._pendentes = {}
+        # Chaves retiradas do heap cujo envio ainda não foi registrado
+        self._em_envio = set()
+        # Última entrada de sincronizar e o dia em que a janela foi expandida
+        self._fontes = None
+        self._expandido_em = None
+        self._sincronizando = threading.Lock()
+        self._cond = threading.Condition()
+        self._parar = False
+        self._thread = None
+
+    @staticmethod
+    def _chave(fp, quando):
+        return f"{fp}:{quando:%Y-%m-%d}"
+
+    def sincronizar(self, transacoes, regras=(), lancadas=None):
+        """Atualiza as pendências a partir das transações e regras recém-lidas.
+
+        `lancadas` é o recorrentes.indice_lancamentos das transações. Só
+        entradas novas vão para o heap; as que sumiram saem de `_pendentes`
+        e são ignoradas quando chegarem ao topo.
+        """
+        with self._sincronizando:
+            self._fontes = (transacoes, regras, lancadas)
+            self._atualiza_pendentes()
+
+    def _reexpande(self):
+        # Chamado pela thread: repete a última sincronização com a janela de hoje
+        with self._sincronizando:
+            if self._fontes is not None and self.agora().date() != self._expandido_em:
+                self._atualiza_pendentes()
+
+    def _atualiza_pendentes(self):
+        transacoes, regras, lancadas = self._fontes
+        hoje = self.agora().date()
+        ocorrencias = recorrentes.expandir(regras, hoje, hoje + timedelta(days=DIAS_RECORRENTES), lancadas)
+        novos = {}
+        for t in chain(transacoes, ocorrencias):
+            if not precisa_aviso(t):
+                continue
+            quando = horario_aviso(t)
+            if quando is None:
+                continue
+            fp = t.get("Fingerprint") or fingerprint_transacao(t)
+            novos[fp] = (quando, t)
+        with self._cond:
+            # Sob o lock: uma chave sai de `_em_envio` só depois de registrada
+            novos = {fp: item for fp, item in novos.items() if not self._ja_tratada(self._chave(fp, item[0]))}
+            for fp in novos.keys() - self._pendentes.keys():
+                heapq.heappush(self._heap, (novos[fp][0], fp))
+            self._pendentes = novos
+            self._expandido_em = hoje
+            self._cond.notify()
+
+    def _ja_tratada(self, chave):
+        return chave in self._em_envio or chave in self.registro
+
+    def _limpa_topo(self):
+        while self._heap:
+            quando, fp = self._heap[0]
+            atual = self._pendentes.get(fp)
+            if atual is not None and atual[0] == quando:
+                return
+            heapq.heappop(self._heap)
+
+    def _retira_devidos(self, agora):
+        devidos = []
+        self._limpa_topo()
+        while self._heap and self._heap[0][0] <= agora:
+            quando, fp = heapq.heappop(self._heap)
+            _, transacao = self._pendentes.pop(fp)
+            # Conta que já venceu sem aviso (app estava fora do ar) não gera lembrete atrasado
+            chave = self._chave(fp, quando)
+            if _data_vencimento(transacao) >= agora.date() and not self._ja_tratada(chave):
+                self._em_envio.add(chave)
+                devidos.append((chave, transacao))
+            self._limpa_topo()
+        return devidos
+
+    def processar(self, agora=None):
+        """Envia os avisos devidos até `agora`, um por telefone, e devolve quantos saíram."""
+        with self._cond:
+            devidos = self._retira_devidos(agora or self.agora())
+        por_telefone = defaultdict(list)
+        for chave, transacao in devidos:
+            por_telefone[str(transacao.get("Telefone")).strip()].append((chave, transacao))
+        for telefone, itens in por_telefone.items():
+            chaves = [chave for chave, _ in itens]
+            try:
+                self.notificador.enviar(telefone, monta_mensagem([t for _, t in itens]))
+                self.registro.registrar(chaves, telefone)
+            except Exception:
+                logger.exception("Falha ao enviar lembrete para %s", telefone)
+            finally:
+                # Enviado (já no registro) ou falhou (volta no próximo sincronizar)
+                with self._cond:
+                    self._em_envio.difference_update(chaves)
+        return len(por_telefone)
+
+    def _segundos_ate_proximo(self):
+        self._limpa_topo()
+        agora = self.agora()
+        esperas = []
+        if self._heap:
+            esperas.append((self._heap[0][0] - agora).total_seconds())
+        if self._expandido_em is not None:
+            # Acorda na virada do dia para reexpandir as recorrentes
+            virada = datetime.combine(self._expandido_em + timedelta(days=1), time())
+            esperas.append((virada - agora).total_seconds())
+        return min(esperas) if esperas else None
+
+    def _executar(self):
+        while True:
+            with self._cond:
+                while not self._parar:
+                    espera = self._segundos_ate_proximo()
+                    if espera is not None and espera <= 0:
+                        break
+                    self._cond.wait(espera)
+                if self._parar:
+                    return
+            self._reexpande()
+            self.processar()
+
+    def iniciar(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._executar, name="lembretes", daemon=True)
+            self._thread.start()
+
+    def parar(self):
+        with self._cond:
+            self._parar = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
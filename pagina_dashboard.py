@@ -1,10 +1,17 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
-from datetime import date
+from datetime import date, timedelta
 from streamlit_extras.metric_cards import style_metric_cards
 from streamlit_lottie import st_lottie
 import requests
+import recorrentes
+
+# Limite de pontos no gráfico de linha; acima disso a série é reduzida
+MAX_PONTOS_LINHA = 400
+# Quantos meses à frente o seletor oferece para ver as recorrentes projetadas
+MESES_PROJETADOS = 12
 
 def mostra_lottie(url, altura=120, key=None):
     try:
@@ -18,53 +25,185 @@ def formatar_brl(valor):
     cor = "#24bb4e" if valor > 0 else "#e4002b" if valor < 0 else "#888"
     return f"<span style='color:{cor}; font-weight:700;'>R$ {abs(valor):,.2f}</span>".replace(",", "X").replace(".", ",").replace("X", ".")
 
-def dashboard_financeiro():
-    # Carregar df das transações reais
-    df = pd.DataFrame(st.session_state.transacoes)
+def _brl(valor):
+    return f"R$ {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
 
-    if df.empty:
-        mostra_lottie("https://assets4.lottiefiles.com/packages/lf20_puciaact.json", altura=140)
-        st.info("Nenhuma transação cadastrada para gerar gráficos.")
-        return
+# ========== Cache (chave: versão dos dados + período + filtros) ==========
+# Os argumentos com "_" não entram no hash do st.cache_data: a versão
+# identifica o conteúdo das transações, então a lista não precisa ser hasheada.
 
+@st.cache_data(max_entries=4, show_spinner=False)
+def _base_transacoes(versao, _transacoes):
+    df = pd.DataFrame(_transacoes)
+    if df.empty:
+        return df
     # Corrigir nome da coluna de data conforme seu app (Data Vencimento ou Data)
     if "Data" in df.columns:
         df["Data"] = pd.to_datetime(df["Data"], errors="coerce")
     elif "Data Vencimento" in df.columns:
         df["Data"] = pd.to_datetime(df["Data Vencimento"], errors="coerce")
     else:
-        st.warning("Coluna de data não encontrada.")
+        return None
+    df = df.dropna(subset=["Data"])  # Remove linhas sem data válida
+    # Ordena uma única vez por versão; os recortes por período já saem ordenados
+    df = df.sort_values("Data", kind="stable").reset_index(drop=True)
+    df["AnoMes"] = df["Data"].dt.strftime("%Y-%m")
+    return df
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def _meses_e_categorias(versao, _transacoes):
+    df = _base_transacoes(versao, _transacoes)
+    if df is None or df.empty:
+        return [], []
+    meses = sorted(df["AnoMes"].unique(), reverse=True)
+    categorias = sorted(df["Categoria"].dropna().astype(str).unique()) if "Categoria" in df.columns else []
+    return meses, categorias
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def _meses_e_categorias_recorrentes(versao_recorrentes, ate, _regras):
+    # Meses em que as regras têm ocorrência (até `ate`) e suas categorias
+    meses = {o["Data Vencimento"][:7] for o in recorrentes.expandir(_regras, None, ate)}
+    categorias = {str(r["categoria"]) for r in _regras if r["categoria"]}
+    return meses, categorias
+
+def reduz_serie(serie_df, max_pontos=MAX_PONTOS_LINHA):
+    """Reduz a série de saldo acumulado para no máximo `max_pontos` pontos.
+
+    Primeiro mantém só o saldo de fechamento de cada dia; se ainda houver
+    pontos demais, amostra em intervalos regulares preservando o primeiro e o
+    último ponto (o saldo final do período).
+    """
+    if len(serie_df) <= max_pontos:
+        return serie_df
+    por_dia = serie_df.groupby(serie_df["Data"].dt.normalize(), sort=True).tail(1)
+    if len(por_dia) <= max_pontos:
+        return por_dia
+    idx = np.unique(np.linspace(0, len(por_dia) - 1, max_pontos).round().astype(int))
+    return por_dia.iloc[idx]
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def calcula_dashboard(versao, inicio, fim, categorias, fim_mes_atual, _transacoes):
+    df = _base_transacoes(versao, _transacoes)
+    # Ocorrências recorrentes depois deste mês não entram no saldo atual;
+    # fim_mes_atual vem como argumento para fazer parte da chave do cache
+    recorrente = df["Recorrente"].notna() if "Recorrente" in df.columns else pd.Series(False, index=df.index)
+    no_saldo = ~(recorrente & (df["Data"].dt.date > fim_mes_atual))
+    periodo = df[(df["Data"].dt.date >= inicio) & (df["Data"].dt.date <= fim)]
+    if categorias:
+        periodo = periodo[periodo["Categoria"].isin(categorias)]
+
+    # Agregações em centavos inteiros; só vira reais na hora de exibir
+    gastos = periodo[periodo["Centavos"] < 0]
+    res = {
+        "saldo_atual": df.loc[no_saldo, "Centavos"].sum() / 100,
+        "entrada": periodo[periodo["Centavos"] > 0]["Centavos"].sum() / 100,
+        "saida": gastos["Centavos"].sum() / 100,
+        "saldo": periodo["Centavos"].sum() / 100,
+        "qtd": len(periodo),
+        "maior_gasto": gastos["Centavos"].min() / 100 if not gastos.empty else 0,
+        "fig_linha": None,
+        "fig_pizza": None,
+        "top5": None,
+    }
+
+    if not periodo.empty:
+        serie = periodo[["Data"]].copy()
+        serie["Saldo_Acumulado"] = periodo["Centavos"].cumsum() / 100
+        serie = reduz_serie(serie)
+        res["fig_linha"] = px.line(
+            serie, x="Data", y="Saldo_Acumulado",
+            markers=len(serie) <= 60, title="Evolução do Saldo no período",
+        )
+
+    if not gastos.empty:
+        por_categoria = gastos.groupby("Categoria", as_index=False)["Centavos"].sum()
+        por_categoria["ValorAbs"] = por_categoria["Centavos"].abs() / 100
+        res["fig_pizza"] = px.pie(por_categoria, names="Categoria", values="ValorAbs",
+                                  title="Gastos por Categoria")
+        top5 = gastos.nsmallest(5, "Centavos")[["Data", "Descrição", "Categoria", "Centavos"]].copy()
+        top5["Valor"] = (top5.pop("Centavos").abs() / 100).map(_brl)
+        res["top5"] = top5.reset_index(drop=True)
+
+    return res
+
+def _seleciona_periodo(meses, categorias_disponiveis):
+    col_modo, col_periodo, col_cat = st.columns([1, 2, 2])
+    with col_modo:
+        modo = st.radio("Período", ["Mês", "Intervalo"], horizontal=True, key="dash_modo")
+    with col_periodo:
+        if modo == "Mês":
+            mes_atual = date.today().strftime("%Y-%m")
+            opcoes = meses if mes_atual in meses else [mes_atual] + meses
+            mes = st.selectbox("Mês", opcoes, index=opcoes.index(mes_atual), key="dash_mes")
+            inicio = date.fromisoformat(mes + "-01")
+            fim = recorrentes.fim_do_mes(inicio)
+            rotulo = inicio.strftime("%m/%Y")
+        else:
+            hoje = date.today()
+            intervalo = st.date_input("Intervalo", value=(hoje.replace(day=1), hoje), format="DD/MM/YYYY", key="dash_intervalo")
+            if not isinstance(intervalo, (list, tuple)):
+                inicio = fim = intervalo
+            elif len(intervalo) == 2:
+                inicio, fim = intervalo
+            elif len(intervalo) == 1:
+                # Enquanto o usuário escolhe a segunda data, usa só o dia selecionado
+                inicio = fim = intervalo[0]
+            else:
+                # Campo limpo: volta ao padrão (do dia 1 até hoje)
+                inicio, fim = hoje.replace(day=1), hoje
+            rotulo = f"{inicio.strftime('%d/%m/%Y')} a {fim.strftime('%d/%m/%Y')}"
+    with col_cat:
+        categorias = st.multiselect("Categorias", categorias_disponiveis, key="dash_categorias")
+    return inicio, fim, tuple(sorted(categorias)), rotulo
+
+def dashboard_financeiro():
+    transacoes = st.session_state.transacoes
+    regras = st.session_state.get("recorrentes", [])
+    versao = st.session_state.get("versao_transacoes", 0)
+
+    if not transacoes and not regras:
+        mostra_lottie("https://assets4.lottiefiles.com/packages/lf20_puciaact.json", altura=140)
+        st.info("Nenhuma transação cadastrada para gerar gráficos.")
         return
 
-    df = df.dropna(subset=["Data"])  # Remove linhas sem data válida
+    if _base_transacoes(versao, transacoes) is None:
+        st.warning("Coluna de data não encontrada.")
+        return
 
-    hoje = date.today()
-    mes_atual = hoje.strftime("%Y-%m")
-    df["AnoMes"] = df["Data"].dt.strftime("%Y-%m")
-    df_mes = df[df["AnoMes"] == mes_atual].copy()
-
-    # Indicadores práticos
-    entradas = df[df["Valor"] > 0]["Valor"].sum()
-    saidas = df[df["Valor"] < 0]["Valor"].sum()
-    saldo_atual = df["Valor"].sum()
-    entrada_mes = df_mes[df_mes["Valor"] > 0]["Valor"].sum()
-    saida_mes = df_mes[df_mes["Valor"] < 0]["Valor"].sum()
-    saldo_mes = df_mes["Valor"].sum()
-    qtd_transacoes = len(df_mes)
-    maior_gasto = df_mes[df_mes["Valor"] < 0]["Valor"].min() if not df_mes[df_mes["Valor"] < 0].empty else 0
+    meses, categorias_disponiveis = _meses_e_categorias(versao, transacoes)
+    fim_mes_atual = recorrentes.fim_do_mes(date.today())
+    if regras:
+        ate = recorrentes.fim_do_mes(fim_mes_atual + timedelta(days=31 * MESES_PROJETADOS))
+        meses_rec, categorias_rec = _meses_e_categorias_recorrentes(
+            st.session_state.get("versao_recorrentes", 0), ate, regras
+        )
+        meses = sorted(set(meses) | meses_rec, reverse=True)
+        categorias_disponiveis = sorted(set(categorias_disponiveis) | categorias_rec)
 
     # Layout visual e bonito
     st.markdown("<h1 style='color:#e4002b;'>💸 Dashboard Financeiro</h1>", unsafe_allow_html=True)
+    inicio, fim, categorias, rotulo = _seleciona_periodo(meses, categorias_disponiveis)
+
+    # As recorrentes são expandidas só até o fim do período mostrado (ou do mês atual)
+    horizonte = max(fim, fim_mes_atual)
+    if regras:
+        transacoes = transacoes + list(recorrentes.expandir(regras, None, horizonte, st.session_state.get("lancadas")))
+        versao = f"{versao}:{st.session_state.get('versao_recorrentes', 0)}:{horizonte}"
+    if not transacoes:
+        st.info("Nenhuma transação no período.")
+        return
+    dados = calcula_dashboard(versao, inicio, fim, categorias, fim_mes_atual, transacoes)
+
     col_anim, col_kpis = st.columns([1, 3])
     with col_anim:
         mostra_lottie("https://assets4.lottiefiles.com/packages/lf20_puciaact.json", altura=130)
 
     with col_kpis:
         kpi1, kpi2, kpi3, kpi4 = st.columns(4)
-        kpi1.metric("Entradas (Mês)", f"R$ {entrada_mes:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."))
-        kpi2.metric("Saídas (Mês)", f"R$ {abs(saida_mes):,.2f}".replace(",", "X").replace(".", ",").replace("X", "."))
-        kpi3.metric("Saldo Atual", f"R$ {saldo_atual:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."))
-        kpi4.metric("Transações", qtd_transacoes)
+        kpi1.metric("Entradas (Período)", _brl(dados["entrada"]))
+        kpi2.metric("Saídas (Período)", _brl(abs(dados["saida"])))
+        kpi3.metric("Saldo Atual", _brl(dados["saldo_atual"]))
+        kpi4.metric("Transações", dados["qtd"])
         style_metric_cards(
             background_color="#fffbe7",
             border_left_color="#e4002b",
@@ -72,42 +211,23 @@ def dashboard_financeiro():
         )
 
     st.markdown("---")
-    st.subheader("📈 Evolução do Saldo Acumulado (Mês Atual)")
-    if not df_mes.empty:
-        df_mes_sorted = df_mes.sort_values("Data")
-        df_mes_sorted["Saldo_Acumulado"] = df_mes_sorted["Valor"].cumsum()
-        st.plotly_chart(
-            px.line(
-                df_mes_sorted, x="Data", y="Saldo_Acumulado",
-                markers=True, title="Evolução do Saldo no mês",
-            ),
-            use_container_width=True
-        )
+    st.subheader(f"📈 Evolução do Saldo Acumulado ({rotulo})")
+    if dados["fig_linha"] is not None:
+        st.plotly_chart(dados["fig_linha"], use_container_width=True)
+    else:
+        st.info("Sem transações no período.")
 
-    st.subheader("🍕 Gastos por Categoria (Mês Atual)")
-    df_gastos = df_mes[df_mes["Valor"] < 0].copy()
-    if not df_gastos.empty:
-        df_gastos["ValorAbs"] = df_gastos["Valor"].abs()
-        st.plotly_chart(
-            px.pie(df_gastos, names="Categoria", values="ValorAbs",
-                   title="Gastos por Categoria"),
-            use_container_width=True
-        )
+    st.subheader(f"🍕 Gastos por Categoria ({rotulo})")
+    if dados["fig_pizza"] is not None:
+        st.plotly_chart(dados["fig_pizza"], use_container_width=True)
     else:
         st.info("Sem despesas para mostrar pizza.")
 
-    st.markdown("### Top 5 Maiores Gastos do Mês")
-    top5 = df_gastos.sort_values("ValorAbs", ascending=False).head(5) if not df_gastos.empty else pd.DataFrame()
-    if not top5.empty:
-        st.dataframe(top5[["Data", "Descrição", "Categoria", "ValorAbs"]]
-            .rename(columns={"ValorAbs": "Valor"})
-            .style.format({"Valor": lambda v: f"R$ {abs(v):,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')}),
-            use_container_width=True
-        )
+    st.markdown("### Top 5 Maiores Gastos do Período")
+    if dados["top5"] is not None:
+        st.dataframe(dados["top5"], use_container_width=True)
     else:
-        st.info("Não há gastos cadastrados neste mês.")
-
-    # ... (código anterior permanece igual)
+        st.info("Não há gastos cadastrados neste período.")
 
     # Outros KPIs (personalizados e bonitos!)
     st.markdown("#### Outros Indicadores")
@@ -115,25 +235,23 @@ def dashboard_financeiro():
     with colA:
         st.markdown(
             """
-            <div style='background: #fffbe7; border-radius: 18px; border-left: 7px solid #e4002b; 
+            <div style='background: #fffbe7; border-radius: 18px; border-left: 7px solid #e4002b;
             box-shadow: 0 2px 8px #e4002b14; padding: 20px 32px; margin-bottom:16px; min-height:60px'>
                 <div style='font-size:1.02em; color:#222; margin-bottom:8px;'>Maior gasto</div>
                 <div style='font-size:1.5em; color:#e4002b; font-weight:800;'>R$ {:,.2f}</div>
             </div>
-            """.format(abs(maior_gasto)).replace(",", "X").replace(".", ",").replace("X", "."),
+            """.format(abs(dados["maior_gasto"])).replace(",", "X").replace(".", ",").replace("X", "."),
             unsafe_allow_html=True
         )
 
     with colB:
         st.markdown(
             """
-            <div style='background: #fffbe7; border-radius: 18px; border-left: 7px solid #24bb4e; 
+            <div style='background: #fffbe7; border-radius: 18px; border-left: 7px solid #24bb4e;
             box-shadow: 0 2px 8px #24bb4e14; padding: 20px 32px; margin-bottom:16px; min-height:60px'>
-                <div style='font-size:1.02em; color:#222; margin-bottom:8px;'>Saldo do mês</div>
+                <div style='font-size:1.02em; color:#222; margin-bottom:8px;'>Saldo do período</div>
                 <div style='font-size:1.5em; color:#24bb4e; font-weight:800;'>R$ {:,.2f}</div>
             </div>
-            """.format(saldo_mes).replace(",", "X").replace(".", ",").replace("X", "."),
+            """.format(dados["saldo"]).replace(",", "X").replace(".", ",").replace("X", "."),
             unsafe_allow_html=True
         )
-
-
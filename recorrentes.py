@@ -0,0 +1,74 @@
+"""Transações recorrentes (Gastos Fixos, Salário...) geradas sob demanda.
+
+Cada regra fica uma única vez na worksheet "Recorrentes"; as ocorrências de
+cada mês só existem em memória, para o intervalo que a página mostra. Quando
+uma ocorrência é marcada como paga ela vira uma linha normal em Transacoes,
+e a partir daí a expansão deixa de gerá-la.
+"""
+from calendar import monthrange
+from collections import Counter
+from datetime import date, timedelta
+
+from valores import CAMPOS_LANCAMENTO, centavos_para_str, fingerprint_transacao
+
+def fim_do_mes(dia):
+    return dia.replace(day=monthrange(dia.year, dia.month)[1])
+
+def _meses(inicio, fim):
+    ano, mes = inicio.year, inicio.month
+    while (ano, mes) <= (fim.year, fim.month):
+        yield ano, mes
+        ano, mes = (ano + 1, 1) if mes == 12 else (ano, mes + 1)
+
+def indice_lancamentos(transacoes):
+    """Conta as transações por (vencimento, descrição, valor) para saber o que já foi lançado."""
+    return Counter(fingerprint_transacao(t, CAMPOS_LANCAMENTO) for t in transacoes)
+
+def ocorrencia(regra, vencimento):
+    centavos = regra["centavos"]
+    transacao = {
+        "Data Vencimento": vencimento.isoformat(),
+        "Data Pagamento": "",
+        "Descrição": regra["descricao"],
+        "Valor": centavos / 100,
+        "Categoria": regra["categoria"],
+        "Tipo": regra["tipo"],
+        "Telefone": regra["telefone"],
+        "Pago": "N",
+        "Centavos": centavos,
+        "Recorrente": regra["id"],
+    }
+    transacao["Fingerprint"] = fingerprint_transacao(transacao)
+    return transacao
+
+def expandir(regras, inicio, fim, lancadas=None):
+    """Gera as ocorrências das regras com vencimento entre `inicio` e `fim`.
+
+    `inicio=None` começa do início de cada regra. O dia é ajustado ao tamanho
+    do mês (dia 31 vira 30/28...). Ocorrências presentes em `lancadas` (ver
+    indice_lancamentos) já estão em Transacoes e não são geradas de novo.
+    """
+    lancadas = lancadas or {}
+    for regra in regras:
+        de = max(regra["inicio"], inicio) if inicio else regra["inicio"]
+        ate = min(regra["fim"], fim) if regra["fim"] else fim
+        if de > ate:
+            continue
+        for ano, mes in _meses(de, ate):
+            vencimento = date(ano, mes, min(regra["dia"], monthrange(ano, mes)[1]))
+            if not de <= vencimento <= ate:
+                continue
+            chave = fingerprint_transacao({
+                "Data Vencimento": vencimento.isoformat(),
+                "Descrição": regra["descricao"],
+                "Valor": centavos_para_str(regra["centavos"]),
+            }, CAMPOS_LANCAMENTO)
+            if lancadas.get(chave):
+                continue
+            yield ocorrencia(regra, vencimento)
+
+def proximas(regras, lancadas, hoje=None, dias=30):
+    """Ocorrências ainda não pagas até `dias` à frente (inclui as atrasadas)."""
+    hoje = hoje or date.today()
+    return sorted(expandir(regras, None, hoje + timedelta(days=dias), lancadas),
+                  key=lambda t: t["Data Vencimento"])
@@ -0,0 +1,93 @@
+import hashlib
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+# Campos usados para identificar uma transação (a data de pagamento fica de fora,
+# como na comparação original da tela Remover)
+CAMPOS_FINGERPRINT = ["Data Vencimento", "Descrição", "Valor", "Categoria", "Tipo", "Telefone", "Pago"]
+# Identifica o lançamento em si: mesma data, descrição e valor
+CAMPOS_LANCAMENTO = ["Data Vencimento", "Descrição", "Valor"]
+
+def _limpa_valor_str(valor_str):
+    valor_str = str(valor_str).replace(" ", "").replace(" ", "").replace("R$", "").strip()
+    if "." in valor_str and "," in valor_str:
+        valor_str = valor_str.replace(".", "")
+        valor_str = valor_str.replace(",", ".")
+    elif "," in valor_str:
+        valor_str = valor_str.replace(",", ".")
+    return valor_str
+
+def normaliza_valor(valor_str):
+    if valor_str is None:
+        return 0.0
+    return float(_limpa_valor_str(valor_str))
+
+def para_centavos(valor):
+    """Converte um valor (texto "1.234,56", número ou Decimal) em centavos inteiros.
+
+    Floats passam por repr() para não herdar o erro binário (0.1 vira 10, não 9).
+    Levanta ValueError se o texto não for numérico.
+    """
+    if valor is None or valor == "":
+        return 0
+    if isinstance(valor, bool):
+        raise ValueError(f"Valor inválido: {valor!r}")
+    if isinstance(valor, int):
+        return valor * 100
+    if isinstance(valor, float):
+        texto = repr(valor)
+    elif isinstance(valor, Decimal):
+        texto = valor
+    else:
+        texto = _limpa_valor_str(valor)
+    try:
+        dec = Decimal(texto)
+    except InvalidOperation:
+        raise ValueError(f"Valor inválido: {valor!r}") from None
+    if not dec.is_finite():
+        raise ValueError(f"Valor inválido: {valor!r}")
+    return int((dec * 100).quantize(Decimal("1"), rounding=ROUND_HALF_UP))
+
+def centavos_para_str(centavos):
+    # Mesmo formato gravado na planilha até hoje ("{:.2f}"), mas sem passar por float
+    sinal = "-" if centavos < 0 else ""
+    centavos = abs(int(centavos))
+    return f"{sinal}{centavos // 100}.{centavos % 100:02d}"
+
+def _canoniza(campo, valor):
+    if campo == "Valor":
+        return str(para_centavos(valor))
+    if isinstance(valor, datetime):
+        return valor.date().isoformat()
+    if isinstance(valor, date):
+        return valor.isoformat()
+    if valor is None:
+        return ""
+    return str(valor).strip()
+
+def fingerprint_transacao(transacao, campos=CAMPOS_FINGERPRINT):
+    """Hash estável de uma transação (dict com as colunas da planilha).
+
+    Linhas iguais campo a campo (com o valor comparado em centavos) geram o
+    mesmo hash, então a busca por linhas vira uma consulta em dicionário.
+    `campos` escolhe quais colunas entram na comparação.
+    """
+    partes = []
+    for campo in campos:
+        try:
+            partes.append(_canoniza(campo, transacao.get(campo)))
+        except ValueError:
+            partes.append("?")
+    return hashlib.sha1("\x1f".join(partes).encode("utf-8")).hexdigest()
+
+def indice_fingerprints(linhas, colunas, primeira_linha=2):
+    """Mapeia fingerprint -> lista de números de linha na planilha.
+
+    `linhas` vem de worksheet.get_all_values() sem o cabeçalho; linhas
+    duplicadas ficam todas na lista, na ordem em que aparecem.
+    """
+    indice = {}
+    for num, valores in enumerate(linhas, start=primeira_linha):
+        fp = fingerprint_transacao(dict(zip(colunas, valores)))
+        indice.setdefault(fp, []).append(num)
+    return indice